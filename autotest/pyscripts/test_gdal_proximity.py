@@ -12,6 +12,8 @@
 # SPDX-License-Identifier: MIT
 ###############################################################################
 
+import struct
+
 import gdaltest
 import pytest
 import test_py_scripts
@@ -143,3 +145,234 @@ def test_gdal_proximity_3(script_path, tmp_path):
     dst_ds = None
 
     assert cs == cs_expected, "got wrong checksum"
+
+
+###############################################################################
+# Check that the SciPy engine gives the same result as GDAL on a case where
+# the latter is exact (single target pixel)
+
+
+@pytest.mark.parametrize(
+    "options", ["", "-maxdist 6 -nodata 255", "-maxdist 6 -fixed-buf-val 1"]
+)
+def test_gdal_proximity_engine_scipy(script_path, tmp_path, options):
+
+    pytest.importorskip("scipy")
+
+    src_tif = str(tmp_path / "src.tif")
+    src_ds = gdal.GetDriverByName("GTiff").Create(src_tif, 20, 15, 1, gdal.GDT_UInt8)
+    src_ds.GetRasterBand(1).WriteRaster(7, 5, 1, 1, b"\x01")
+    src_ds = None
+
+    results = []
+    for engine in ("gdal", "scipy"):
+        output_tif = str(tmp_path / f"proximity_{engine}.tif")
+        test_py_scripts.run_py_script(
+            script_path,
+            "gdal_proximity",
+            f"-q {options} -engine {engine} {src_tif} {output_tif}",
+        )
+
+        with gdal.Open(output_tif) as dst_ds:
+            results.append(dst_ds.GetRasterBand(1).ReadRaster())
+
+    assert results[0] == results[1]
+
+
+###############################################################################
+# Test -values with negative target values
+
+
+def test_gdal_proximity_negative_values(script_path, tmp_path):
+
+    src_tif = str(tmp_path / "src.tif")
+    src_ds = gdal.GetDriverByName("GTiff").Create(src_tif, 5, 1, 1, gdal.GDT_Int16)
+    src_ds.GetRasterBand(1).WriteRaster(0, 0, 5, 1, struct.pack("<5h", -1, 0, 0, 0, -2))
+    src_ds = None
+
+    output_tif = str(tmp_path / "proximity.tif")
+    test_py_scripts.run_py_script(
+        script_path,
+        "gdal_proximity",
+        f"-q -values -1,-2 -ot Int16 {src_tif} {output_tif}",
+    )
+
+    with gdal.Open(output_tif) as dst_ds:
+        assert struct.unpack(
+            "<5h", dst_ds.GetRasterBand(1).ReadRaster(buf_type=gdal.GDT_Int16)
+        ) == (0, 1, 2, 1, 0)
+
+
+###############################################################################
+# Test a negative -nodata value in exponent notation
+
+
+def test_gdal_proximity_negative_nodata(script_path, tmp_path):
+
+    src_tif = str(tmp_path / "src.tif")
+    src_ds = gdal.GetDriverByName("GTiff").Create(src_tif, 5, 1, 1, gdal.GDT_UInt8)
+    src_ds.GetRasterBand(1).WriteRaster(0, 0, 1, 1, b"\x01")
+    src_ds = None
+
+    output_tif = str(tmp_path / "proximity.tif")
+    test_py_scripts.run_py_script(
+        script_path,
+        "gdal_proximity",
+        f"-q -maxdist 2 -nodata -3.4e38 {src_tif} {output_tif}",
+    )
+
+    with gdal.Open(output_tif) as dst_ds:
+        assert struct.unpack(
+            "<5f", dst_ds.GetRasterBand(1).ReadRaster(buf_type=gdal.GDT_Float32)
+        ) == pytest.approx((0, 1, 2, -3.4e38, -3.4e38), rel=1e-6)
+
+
+###############################################################################
+# Check that processing by strips in several threads gives the same result
+# as processing the whole raster at once
+
+
+def test_gdal_proximity_num_threads(script_path, tmp_path):
+
+    src_tif = str(tmp_path / "src.tif")
+    src_ds = gdal.GetDriverByName("GTiff").Create(src_tif, 20, 50, 1, gdal.GDT_UInt8)
+    for x, y in ((3, 2), (15, 11), (8, 12), (1, 25), (19, 26), (10, 49)):
+        src_ds.GetRasterBand(1).WriteRaster(x, y, 1, 1, b"\x01")
+    src_ds = None
+
+    results = []
+    for num_threads in (1, 3):
+        output_tif = str(tmp_path / f"proximity_{num_threads}.tif")
+        test_py_scripts.run_py_script(
+            script_path,
+            "gdal_proximity",
+            f"-q -maxdist 5 -nodata 255 -num_threads {num_threads} {src_tif} {output_tif}",
+        )
+
+        with gdal.Open(output_tif) as dst_ds:
+            results.append(dst_ds.GetRasterBand(1).ReadRaster())
+
+    assert results[0] == results[1]
+
+
+###############################################################################
+# Test -auto_type
+
+
+def test_gdal_proximity_auto_type(script_path, tmp_path):
+
+    output_tif = str(tmp_path / "proximity_auto_type.tif")
+
+    _, err = test_py_scripts.run_py_script(
+        script_path,
+        "gdal_proximity",
+        "-ot UInt16 " + test_py_scripts.get_data_path("alg") + f"pat.tif {output_tif}",
+        return_stderr=True,
+    )
+    assert "requires a temporary file" in err
+
+    gdal.Unlink(output_tif)
+
+    _, err = test_py_scripts.run_py_script(
+        script_path,
+        "gdal_proximity",
+        "-ot UInt16 -auto_type "
+        + test_py_scripts.get_data_path("alg")
+        + f"pat.tif {output_tif}",
+        return_stderr=True,
+    )
+    assert "requires a temporary file" not in err
+
+    with gdal.Open(output_tif) as dst_ds:
+        assert dst_ds.GetRasterBand(1).DataType == gdal.GDT_Float32
+
+
+###############################################################################
+# Test writing to a format that only supports CreateCopy()
+
+
+def test_gdal_proximity_createcopy_only_driver(script_path, tmp_path):
+
+    if gdal.GetDriverByName("PNG") is None:
+        pytest.skip("PNG driver missing")
+
+    results = []
+    for driver_name, ext in (("GTiff", "tif"), ("PNG", "png")):
+        output_file = str(tmp_path / f"proximity.{ext}")
+        test_py_scripts.run_py_script(
+            script_path,
+            "gdal_proximity",
+            f"-q -of {driver_name} -ot Byte "
+            + test_py_scripts.get_data_path("alg")
+            + f"pat.tif {output_file}",
+        )
+
+        with gdal.Open(output_file) as dst_ds:
+            assert dst_ds.GetDriver().ShortName == driver_name
+            results.append(dst_ds.GetRasterBand(1).Checksum())
+
+    assert results[0] == results[1]
+
+
+###############################################################################
+# Test -threshold
+
+
+def test_gdal_proximity_threshold(script_path, tmp_path):
+
+    gdaltest.importorskip_gdal_array()
+    np = pytest.importorskip("numpy")
+
+    src_tif = test_py_scripts.get_data_path("alg") + "pat.tif"
+    dist_tif = str(tmp_path / "proximity_dist.tif")
+    mask_tif = str(tmp_path / "proximity_mask.tif")
+
+    test_py_scripts.run_py_script(
+        script_path, "gdal_proximity", f"-q -maxdist 10 {src_tif} {dist_tif}"
+    )
+    test_py_scripts.run_py_script(
+        script_path,
+        "gdal_proximity",
+        f"-q -maxdist 10 -threshold 3.5 {src_tif} {mask_tif}",
+    )
+
+    with gdal.Open(dist_tif) as dist_ds:
+        dist = dist_ds.GetRasterBand(1).ReadAsArray()
+
+    with gdal.Open(mask_tif) as mask_ds:
+        assert mask_ds.GetRasterBand(1).DataType == gdal.GDT_UInt8
+        mask = mask_ds.GetRasterBand(1).ReadAsArray()
+
+    expected = (dist <= 3.5) & (dist != 65535)
+    assert expected.any() and not expected.all()
+    assert np.array_equal(mask, expected.astype(np.uint8))
+
+
+###############################################################################
+# Test -threshold when the distances do not fit in the block cache
+
+
+def test_gdal_proximity_threshold_temp_file(script_path, tmp_path):
+
+    gdaltest.importorskip_gdal_array()
+
+    src_tif = str(tmp_path / "src.tif")
+    src_ds = gdal.GetDriverByName("GTiff").Create(src_tif, 600, 600, 1, gdal.GDT_UInt8)
+    for x, y in ((10, 20), (300, 310), (590, 5)):
+        src_ds.GetRasterBand(1).WriteRaster(x, y, 1, 1, b"\x01")
+    src_ds = None
+
+    results = []
+    for config in ("", "--config GDAL_CACHEMAX 1"):
+        output_tif = str(tmp_path / f"proximity_mask_{len(results)}.tif")
+        test_py_scripts.run_py_script(
+            script_path,
+            "gdal_proximity",
+            f"-q {config} -threshold 100 {src_tif} {output_tif}",
+        )
+
+        with gdal.Open(output_tif) as dst_ds:
+            results.append(dst_ds.GetRasterBand(1).ReadRaster())
+
+    assert results[0] == results[1]
+    assert b"\x01" in results[0] and b"\x00" in results[0]
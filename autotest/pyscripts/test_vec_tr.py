@@ -0,0 +1,232 @@
+#!/usr/bin/env pytest
+###############################################################################
+#
+# Project:  GDAL/OGR Test Suite
+# Purpose:  Test vec_tr.py sample script
+#
+###############################################################################
+#
+# SPDX-License-Identifier: MIT
+###############################################################################
+
+import pytest
+import test_py_scripts
+
+from osgeo import ogr
+
+pytestmark = [
+    pytest.mark.skipif(
+        test_py_scripts.get_py_script("vec_tr") is None,
+        reason="vec_tr.py not available",
+    ),
+    pytest.mark.require_driver("GPKG"),
+]
+
+
+@pytest.fixture()
+def script_path():
+    return test_py_scripts.get_py_script("vec_tr")
+
+
+###############################################################################
+# Create a GPKG layer with the given (WKT, name, value) features
+
+
+def create_source(filename, features, geom_type=ogr.wkbUnknown):
+
+    ds = ogr.GetDriverByName("GPKG").CreateDataSource(filename)
+    lyr = ds.CreateLayer("test", geom_type=geom_type)
+    lyr.CreateField(ogr.FieldDefn("name", ogr.OFTString))
+    lyr.CreateField(ogr.FieldDefn("val", ogr.OFTInteger))
+    for wkt, name, val in features:
+        f = ogr.Feature(lyr.GetLayerDefn())
+        f["name"] = name
+        f["val"] = val
+        f.SetGeometry(ogr.CreateGeometryFromWkt(wkt))
+        lyr.CreateFeature(f)
+    ds = None
+
+
+###############################################################################
+# Check that the output has the features of the source, in the same order,
+# with the expected geometries
+
+
+def check_output(filename, features, expected_wkts):
+
+    ds = ogr.Open(filename)
+    lyr = ds.GetLayer(0)
+    assert lyr.GetFeatureCount() == len(features)
+    for (_, name, val), expected_wkt, f in zip(features, expected_wkts, lyr):
+        assert f["name"] == name
+        assert f["val"] == val
+        assert (
+            f.GetGeometryRef().ExportToIsoWkt()
+            == ogr.CreateGeometryFromWkt(expected_wkt).ExportToIsoWkt()
+        )
+
+
+###############################################################################
+# Test transforming geometries of various types and dimensions, serially and
+# in several processes
+
+
+@pytest.mark.parametrize("options", ["", "-j 2"])
+def test_vec_tr_geometry_types(script_path, tmp_path, options):
+
+    features = [
+        ("POINT (1 2)", "a", 1),
+        ("LINESTRING (0 0,1 1)", "b", 2),
+        ("POLYGON ((0 0,0 1,1 1,0 0))", "c", 3),
+        ("MULTIPOINT ((0 0),(1 1))", "d", 4),
+        ("MULTILINESTRING Z ((0 0 5,1 1 6))", "e", 5),
+        ("GEOMETRYCOLLECTION (POINT (3 4),LINESTRING (0 0,1 1))", "f", 6),
+        ("POINT M (1 2 3)", "g", 7),
+        ("LINESTRING ZM (0 0 1 2,1 1 3 4)", "h", 8),
+    ]
+    expected_wkts = [
+        "POINT (1001 2)",
+        "LINESTRING (1000 0,1001 1)",
+        "POLYGON ((1000 0,1000 1,1001 1,1000 0))",
+        "MULTIPOINT ((1000 0),(1001 1))",
+        "MULTILINESTRING Z ((1000 0 15,1001 1 16))",
+        "GEOMETRYCOLLECTION (POINT (1003 4),LINESTRING (1000 0,1001 1))",
+        "POINT M (1001 2 3)",
+        "LINESTRING ZM (1000 0 11 2,1001 1 13 4)",
+    ]
+
+    src_filename = str(tmp_path / "src.gpkg")
+    create_source(src_filename, features)
+
+    dst_filename = str(tmp_path / "dst.gpkg")
+    test_py_scripts.run_py_script(
+        script_path,
+        "vec_tr",
+        f"{options} -f GPKG -offset 1000 0 10 {src_filename} {dst_filename}",
+    )
+
+    check_output(dst_filename, features, expected_wkts)
+
+
+###############################################################################
+# Test the default translation, and an identity one, with the Arrow stream
+# path when it is available
+
+
+@pytest.mark.parametrize(
+    "options,expected_wkts",
+    [
+        ("", ["POINT (1001 2)", "POINT (1003 4)", "POINT (1005 6)"]),
+        ("-offset 0 0 0", ["POINT (1 2)", "POINT (3 4)", "POINT (5 6)"]),
+    ],
+)
+def test_vec_tr_points(script_path, tmp_path, options, expected_wkts):
+
+    features = [
+        ("POINT (1 2)", "a", 1),
+        ("POINT (3 4)", "b", 2),
+        ("POINT (5 6)", "c", 3),
+    ]
+
+    src_filename = str(tmp_path / "src.gpkg")
+    create_source(src_filename, features, geom_type=ogr.wkbPoint)
+
+    dst_filename = str(tmp_path / "dst.shp")
+    test_py_scripts.run_py_script(
+        script_path, "vec_tr", f"{options} {src_filename} {dst_filename}"
+    )
+
+    check_output(dst_filename, features, expected_wkts)
+
+
+###############################################################################
+# Test curve geometries, including inside a geometry collection
+
+
+def test_vec_tr_curve_geometries(script_path, tmp_path):
+
+    features = [
+        ("CIRCULARSTRING (0 0,1 1,2 0)", "a", 1),
+        ("GEOMETRYCOLLECTION (CIRCULARSTRING (0 0,1 1,2 0))", "b", 2),
+        ("GEOMETRYCOLLECTION (POINT (1 2),CIRCULARSTRING (0 0,1 1,2 0))", "c", 3),
+    ]
+    expected_wkts = [
+        "CIRCULARSTRING (1000 0,1001 1,1002 0)",
+        "GEOMETRYCOLLECTION (CIRCULARSTRING (1000 0,1001 1,1002 0))",
+        "GEOMETRYCOLLECTION (POINT (1001 2),CIRCULARSTRING (1000 0,1001 1,1002 0))",
+    ]
+
+    src_filename = str(tmp_path / "src.gpkg")
+    create_source(src_filename, features)
+
+    dst_filename = str(tmp_path / "dst.gpkg")
+    test_py_scripts.run_py_script(
+        script_path, "vec_tr", f"-f GPKG {src_filename} {dst_filename}"
+    )
+
+    check_output(dst_filename, features, expected_wkts)
+
+
+###############################################################################
+# Test that fields after one that the output driver cannot create are
+# copied into the right output fields
+
+
+def test_vec_tr_field_not_created(script_path, tmp_path):
+
+    src_filename = str(tmp_path / "src.gpkg")
+    ds = ogr.GetDriverByName("GPKG").CreateDataSource(src_filename)
+    lyr = ds.CreateLayer("test", geom_type=ogr.wkbPoint)
+    lyr.CreateField(ogr.FieldDefn("name", ogr.OFTString))
+    lyr.CreateField(ogr.FieldDefn("data", ogr.OFTBinary))
+    lyr.CreateField(ogr.FieldDefn("val", ogr.OFTInteger))
+    f = ogr.Feature(lyr.GetLayerDefn())
+    f["name"] = "a"
+    f.SetFieldBinaryFromHexString("data", "0102")
+    f["val"] = 5
+    f.SetGeometry(ogr.CreateGeometryFromWkt("POINT (1 2)"))
+    lyr.CreateFeature(f)
+    ds = None
+
+    # Shapefiles do not support binary fields
+    dst_filename = str(tmp_path / "dst.shp")
+    test_py_scripts.run_py_script(
+        script_path, "vec_tr", f"{src_filename} {dst_filename}"
+    )
+
+    ds = ogr.Open(dst_filename)
+    lyr = ds.GetLayer(0)
+    assert [
+        lyr.GetLayerDefn().GetFieldDefn(i).GetName()
+        for i in range(lyr.GetLayerDefn().GetFieldCount())
+    ] == ["name", "val"]
+    f = lyr.GetNextFeature()
+    assert f["name"] == "a"
+    assert f["val"] == 5
+    assert f.GetGeometryRef().ExportToIsoWkt() == "POINT (1001 2)"
+
+
+###############################################################################
+# Test a geometry collection layer with curve members
+
+
+def test_vec_tr_geometry_collection_layer_with_curves(script_path, tmp_path):
+
+    features = [
+        ("GEOMETRYCOLLECTION (POINT (1 2))", "a", 1),
+        ("GEOMETRYCOLLECTION (CIRCULARSTRING (0 0,1 1,2 0))", "b", 2),
+    ]
+    expected_wkts = [
+        "GEOMETRYCOLLECTION (POINT (1001 2))",
+        "GEOMETRYCOLLECTION (CIRCULARSTRING (1000 0,1001 1,1002 0))",
+    ]
+
+    src_filename = str(tmp_path / "src.gpkg")
+    create_source(src_filename, features, geom_type=ogr.wkbGeometryCollection)
+
+    dst_filename = str(tmp_path / "dst.gpkg")
+    test_py_scripts.run_py_script(
+        script_path, "vec_tr", f"-f GPKG {src_filename} {dst_filename}"
+    )
+
+    check_output(dst_filename, features, expected_wkts)
@@ -14,146 +14,279 @@
 # SPDX-License-Identifier: MIT
 # ******************************************************************************
 
+import math
+import os
+import shutil
 import sys
+import tempfile
+import textwrap
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Sequence
 
 from osgeo import gdal
+from osgeo_utils.auxiliary.gdal_argparse import GDALArgumentParser, GDALScript
 from osgeo_utils.auxiliary.util import GetOutputDriverFor, enable_gdal_exceptions
 
 
-def Usage(isError):
-    f = sys.stderr if isError else sys.stdout
-    print(
-        """
-Usage: gdal_proximity [--help] [--help-general]
-                  <srcfile> <dstfile> [-srcband <n>] [-dstband <n>]
-                  [-of <format>] [-co <name>=<value>]...
-                  [-ot {Byte|UInt16|UInt32|Float32|etc}]
-                  [-values <n>,<n>,<n>] [-distunits {PIXEL|GEO}]
-                  [-maxdist <n>] [-nodata <n>] [-use_input_nodata {YES|NO}]
-                  [-fixed-buf-val <n>] [-q] """,
-        file=f,
-    )
-    return 2 if isError else 0
+def parse_alg_options(alg_options):
+    """Return the NAME=VALUE algorithm options as a dictionary with upper-case keys"""
+    options = {}
+    for opt in alg_options:
+        key, value = opt.split("=", 1)
+        options[key.upper()] = value
+    return options
+
+
+def get_output_nodata(options, dstband) -> float:
+    """Return the nodata value used by the algorithm for dstband: the NODATA
+    option, else the nodata value of dstband, else 65535."""
+    if "NODATA" in options:
+        return float(options["NODATA"])
+    nodata = dstband.GetNoDataValue()
+    return nodata if nodata is not None else 65535.0
+
+
+def open_source(src_filename, multithreaded_decoding=True):
+    """Open the source raster read-only, with settings that speed up opening
+    and decoding it, unless the user configured them explicitly."""
+
+    config_options = {}
+    if gdal.GetConfigOption("GDAL_DISABLE_READDIR_ON_OPEN") is None:
+        # Sidecar files (.aux.xml, .ovr, world files...) are still probed
+        # individually, but the directory is not listed.
+        config_options["GDAL_DISABLE_READDIR_ON_OPEN"] = "TRUE"
+    if gdal.GetConfigOption("VSI_CACHE") is None:
+        config_options["VSI_CACHE"] = "TRUE"
+
+    with gdal.config_options(config_options):
+        open_options = []
+        if multithreaded_decoding and gdal.GetConfigOption("GDAL_NUM_THREADS") is None:
+            drv = gdal.IdentifyDriverEx(src_filename, gdal.OF_RASTER)
+            if drv is not None and 'name="NUM_THREADS"' in (
+                drv.GetMetadataItem(gdal.DMD_OPENOPTIONLIST) or ""
+            ):
+                open_options.append("NUM_THREADS=ALL_CPUS")
+
+        return gdal.OpenEx(
+            src_filename,
+            gdal.OF_RASTER | gdal.OF_READONLY,
+            open_options=open_options,
+        )
 
 
-@enable_gdal_exceptions
-def main(argv=sys.argv):
+def get_distance_transform(engine):
+    """Return a function computing, for each True pixel of a 2D boolean array,
+    the Euclidean distance to the nearest False pixel."""
 
-    driver_name = None
-    creation_options = []
-    alg_options = []
-    src_filename = None
-    src_band_n = 1
-    dst_filename = None
-    dst_band_n = 1
-    creation_type = "Float32"
-    quiet = False
+    if engine == "cupy":
+        try:
+            import cupy
+            from cupyx.scipy.ndimage import distance_transform_edt as gpu_edt
 
-    argv = gdal.GeneralCmdLineProcessor(argv)
-    if argv is None:
-        return 0
+            has_gpu = cupy.cuda.runtime.getDeviceCount() > 0
+        except Exception:
+            has_gpu = False
 
-    # Parse command line arguments.
-    i = 1
-    while i < len(argv):
-        arg = argv[i]
+        if has_gpu:
 
-        if arg == "--help":
-            return Usage(isError=False)
+            def cupy_distance_transform(non_target):
+                try:
+                    return cupy.asnumpy(gpu_edt(cupy.asarray(non_target)))
+                except cupy.cuda.memory.OutOfMemoryError:
+                    return get_distance_transform("scipy")(non_target)
 
-        elif arg == "-of" or arg == "-f":
-            i = i + 1
-            driver_name = argv[i]
+            return cupy_distance_transform
 
-        elif arg == "-co":
-            i = i + 1
-            creation_options.append(argv[i])
+        print(
+            "No CUDA device available through CuPy. Falling back to SciPy.",
+            file=sys.stderr,
+        )
+        engine = "scipy"
 
-        elif arg == "-ot":
-            i = i + 1
-            creation_type = argv[i]
+    if engine == "scipy":
+        from scipy.ndimage import distance_transform_edt
 
-        elif arg == "-maxdist":
-            i = i + 1
-            alg_options.append("MAXDIST=" + argv[i])
+        return distance_transform_edt
 
-        elif arg == "-values":
-            i = i + 1
-            alg_options.append("VALUES=" + argv[i])
+    if engine == "opencv":
+        import cv2
+        import numpy as np
 
-        elif arg == "-distunits":
-            i = i + 1
-            alg_options.append("DISTUNITS=" + argv[i])
+        def opencv_distance_transform(non_target):
+            return cv2.distanceTransform(
+                non_target.astype(np.uint8), cv2.DIST_L2, cv2.DIST_MASK_PRECISE
+            )
 
-        elif arg == "-nodata":
-            i = i + 1
-            alg_options.append("NODATA=" + argv[i])
+        return opencv_distance_transform
 
-        elif arg == "-use_input_nodata":
-            i = i + 1
-            alg_options.append("USE_INPUT_NODATA=" + argv[i])
+    raise ValueError("Unknown proximity engine: %s" % engine)
 
-        elif arg == "-fixed-buf-val":
-            i = i + 1
-            alg_options.append("FIXED_BUF_VAL=" + argv[i])
 
-        elif arg == "-srcband":
-            i = i + 1
-            src_band_n = int(argv[i])
+def compute_proximity_numpy(srcband, dstband, alg_options, engine):
+    """Compute a proximity map with an exact Euclidean distance transform
+    provided by SciPy, CuPy (on a CUDA GPU) or OpenCV, honouring the same
+    options as gdal.ComputeProximity().
 
-        elif arg == "-dstband":
-            i = i + 1
-            dst_band_n = int(argv[i])
+    The whole band is processed in memory."""
 
-        elif arg == "-q" or arg == "-quiet":
-            quiet = True
+    import numpy as np
 
-        elif arg[0] == "-":
-            sys.stderr.write("Unrecognized option : %s\n" % argv[i])
-            return Usage(isError=True)
+    distance_transform_edt = get_distance_transform(engine)
 
-        elif src_filename is None:
-            src_filename = argv[i]
+    options = parse_alg_options(alg_options)
 
-        elif dst_filename is None:
-            dst_filename = argv[i]
+    dist_mult = 1.0
+    if options.get("DISTUNITS", "PIXEL").upper() == "GEO":
+        dist_mult = abs(srcband.GetDataset().GetGeoTransform()[1])
 
-        else:
-            return Usage(isError=True)
+    if "MAXDIST" in options:
+        max_dist = float(options["MAXDIST"]) / dist_mult
+    else:
+        max_dist = srcband.XSize + srcband.YSize
+
+    nodata = get_output_nodata(options, dstband)
+
+    src_array = srcband.ReadAsArray(buf_type=gdal.GDT_Int32)
+    if "VALUES" in options:
+        target_values = [int(v) for v in options["VALUES"].split(",")]
+        is_target = np.isin(src_array, target_values)
+    else:
+        is_target = src_array != 0
+
+    if is_target.any():
+        dist = distance_transform_edt(~is_target)
+        is_nodata = dist > max_dist
+    else:
+        dist = np.zeros(src_array.shape)
+        is_nodata = np.ones(src_array.shape, dtype=bool)
+
+    src_nodata = srcband.GetNoDataValue()
+    if (
+        options.get("USE_INPUT_NODATA", "NO").upper() in ("YES", "TRUE", "ON", "1")
+        and src_nodata is not None
+    ):
+        is_nodata |= (src_array == src_nodata) & ~is_target
+
+    if "FIXED_BUF_VAL" in options:
+        result = np.where(dist > 0, float(options["FIXED_BUF_VAL"]), 0.0)
+    else:
+        result = dist * dist_mult
+    result[is_nodata] = nodata
+
+    dstband.WriteArray(result.astype(np.float32))
+
+
+def get_strip_halo(src_ds, alg_options) -> Optional[int]:
+    """Return the number of lines beyond which target pixels have no influence,
+    or None if MAXDIST is not specified."""
+
+    options = parse_alg_options(alg_options)
+    if "MAXDIST" not in options:
+        return None
+
+    max_dist = float(options["MAXDIST"])
+    if options.get("DISTUNITS", "PIXEL").upper() == "GEO":
+        max_dist /= abs(src_ds.GetGeoTransform()[1])
+    return int(math.ceil(max_dist)) + 1
 
-        i = i + 1
 
-    if src_filename is None:
-        sys.stderr.write("Missing <srcfile>\n")
-        return Usage(isError=True)
+def compute_proximity_strips(
+    src_filename, src_band_n, dstband, alg_options, halo, num_threads
+):
+    """Compute a proximity map by splitting the raster in horizontal strips,
+    processed in parallel by gdal.ComputeProximity().
+
+    Each strip is extended by halo lines on each side, which must be at
+    least MAXDIST, so that the result in the strip itself does not depend
+    on target pixels outside of the extended strip.
+    """
+
+    options = parse_alg_options(alg_options)
+    if "NODATA" not in options:
+        # Use the same nodata value as if the algorithm was run on dstband
+        alg_options = list(alg_options) + [
+            "NODATA=%.17g" % get_output_nodata(options, dstband)
+        ]
+
+    xsize = dstband.XSize
+    ysize = dstband.YSize
+    strip_height = (ysize + num_threads - 1) // num_threads
+
+    def process_strip(y_off):
+        y_end = min(y_off + strip_height, ysize)
+        y_start_halo = max(0, y_off - halo)
+        y_end_halo = min(ysize, y_end + halo)
+
+        # Each thread uses its own dataset handle. The strips are already
+        # processed in parallel, so decoding is not multithreaded.
+        with open_source(src_filename, multithreaded_decoding=False) as src_ds:
+            strip_ds = gdal.Translate(
+                "",
+                src_ds,
+                format="MEM",
+                bandList=[src_band_n],
+                srcWin=[0, y_start_halo, xsize, y_end_halo - y_start_halo],
+            )
+        prox_ds = gdal.GetDriverByName("MEM").Create(
+            "", xsize, y_end_halo - y_start_halo, 1, gdal.GDT_Float32
+        )
+        gdal.ComputeProximity(
+            strip_ds.GetRasterBand(1), prox_ds.GetRasterBand(1), alg_options
+        )
+        return (
+            y_off,
+            y_end - y_off,
+            prox_ds.GetRasterBand(1).ReadRaster(
+                0, y_off - y_start_halo, xsize, y_end - y_off
+            ),
+        )
+
+    with ThreadPoolExecutor(max_workers=num_threads) as executor:
+        for y_off, height, data in executor.map(
+            process_strip, range(0, ysize, strip_height)
+        ):
+            dstband.WriteRaster(
+                0, y_off, xsize, height, data, buf_type=gdal.GDT_Float32
+            )
 
-    if dst_filename is None:
-        sys.stderr.write("Missing <dstfile>\n")
-        return Usage(isError=True)
 
-    return gdal_proximity(
-        src_filename=src_filename,
-        src_band_n=src_band_n,
-        dst_filename=dst_filename,
-        dst_band_n=dst_band_n,
-        driver_name=driver_name,
-        creation_type=creation_type,
-        creation_options=creation_options,
-        alg_options=alg_options,
-        quiet=quiet,
-    )
+def threshold_proximity(proxband, dstband, threshold):
+    """Write to dstband a mask set to 1 where the distance in proxband is at
+    most threshold, and to 0 elsewhere (including nodata pixels).
 
+    The proximity band is processed by chunks of the height of the blocks
+    of dstband."""
 
+    import numpy as np
+
+    nodata = proxband.GetNoDataValue()
+    xsize = dstband.XSize
+    ysize = dstband.YSize
+    _, block_ysize = dstband.GetBlockSize()
+
+    for y_off in range(0, ysize, block_ysize):
+        height = min(block_ysize, ysize - y_off)
+        dist = proxband.ReadAsArray(0, y_off, xsize, height)
+        mask = dist <= threshold
+        if nodata is not None:
+            mask &= dist != np.float32(nodata)
+        dstband.WriteArray(mask.astype(np.uint8), 0, y_off)
+
+
+@enable_gdal_exceptions
 def gdal_proximity(
     src_filename: Optional[str] = None,
     src_band_n: int = 1,
     dst_filename: Optional[str] = None,
     dst_band_n: int = 1,
     driver_name: Optional[str] = None,
-    creation_type: str = "Float32",
+    creation_type: Optional[str] = None,
     creation_options: Optional[Sequence[str]] = None,
     alg_options: Optional[Sequence[str]] = None,
+    engine: str = "gdal",
+    num_threads: int = 1,
+    auto_type: bool = False,
+    threshold: Optional[float] = None,
     quiet: bool = False,
 ):
 
@@ -162,7 +295,13 @@ def gdal_proximity(
     # =============================================================================
     creation_options = creation_options or []
     alg_options = alg_options or []
-    src_ds = gdal.Open(src_filename)
+    if creation_type is None:
+        creation_type = "Byte" if threshold is not None else "Float32"
+    if engine not in ("gdal", "scipy", "opencv", "cupy"):
+        print("Unknown proximity engine: %s" % engine)
+        return 1
+
+    src_ds = open_source(src_filename)
 
     if src_ds is None:
         print("Unable to open %s" % src_filename)
@@ -170,19 +309,35 @@ def gdal_proximity(
 
     srcband = src_ds.GetRasterBand(src_band_n)
 
+    # Strip based parallelization is only possible if target pixels have
+    # a bounded range of influence.
+    halo = get_strip_halo(src_ds, alg_options) if num_threads > 1 else None
+    if halo is not None and src_ds.RasterYSize < 2 * halo * num_threads:
+        halo = None
+
+    # gdal.ComputeProximity() needs a signed working band: with an unsigned
+    # output band, it goes through a Float32 temporary GTiff file.
+    unsigned_types = (gdal.GDT_UInt8, gdal.GDT_UInt16, gdal.GDT_UInt32)
+    uses_temp_file = engine == "gdal" and halo is None and threshold is None
+
     # =============================================================================
     #       Try opening the destination file as an existing file.
     # =============================================================================
 
-    try:
-        driver_name = gdal.IdentifyDriver(dst_filename)
-        if driver_name is not None:
-            dst_ds = gdal.Open(dst_filename, gdal.GA_Update)
+    # Only probe for an existing file if there is one, and let gdal.OpenEx()
+    # identify its driver (restricted to the requested one, if any).
+    dst_ds = None
+    copy_drv = None
+    if gdal.VSIStatL(dst_filename) is not None:
+        try:
+            dst_ds = gdal.OpenEx(
+                dst_filename,
+                gdal.OF_RASTER | gdal.OF_UPDATE,
+                allowed_drivers=[driver_name] if driver_name else None,
+            )
             dstband = dst_ds.GetRasterBand(dst_band_n)
-        else:
+        except Exception:
             dst_ds = None
-    except Exception:
-        dst_ds = None
 
     # =============================================================================
     #     Create output file.
@@ -191,14 +346,42 @@ def gdal_proximity(
         if driver_name is None:
             driver_name = GetOutputDriverFor(dst_filename)
 
+        if (
+            auto_type
+            and uses_temp_file
+            and gdal.GetDataTypeByName(creation_type) in unsigned_types
+        ):
+            creation_type = "Float32"
+
+        # Drivers that only support CreateCopy() (PNG, JPEG, ...) cannot
+        # receive the scanline writes of the algorithm: compute into a MEM
+        # dataset, and encode it in a single pass at the end.
         drv = gdal.GetDriverByName(driver_name)
+        if drv.GetMetadataItem(gdal.DCAP_CREATE) != "YES":
+            copy_drv = drv
+            drv = gdal.GetDriverByName("MEM")
+
+        # Drivers such as GTiff read the number of compression threads when
+        # the dataset is created: let them use all CPUs, unless configured
+        # otherwise.
+        out_drv = copy_drv or drv
+        if (
+            gdal.GetConfigOption("GDAL_NUM_THREADS") is None
+            and not any(
+                co.upper().startswith("NUM_THREADS=") for co in creation_options
+            )
+            and 'name="NUM_THREADS"'
+            in (out_drv.GetMetadataItem(gdal.DMD_CREATIONOPTIONLIST) or "")
+        ):
+            creation_options = list(creation_options) + ["NUM_THREADS=ALL_CPUS"]
+
         dst_ds = drv.Create(
-            dst_filename,
+            "" if copy_drv is not None else dst_filename,
             src_ds.RasterXSize,
             src_ds.RasterYSize,
             1,
             gdal.GetDataTypeByName(creation_type),
-            creation_options,
+            [] if copy_drv is not None else creation_options,
         )
 
         dst_ds.SetGeoTransform(src_ds.GetGeoTransform())
@@ -215,7 +398,82 @@ def gdal_proximity(
     else:
         prog_func = gdal.TermProgress_nocb
 
-    gdal.ComputeProximity(srcband, dstband, alg_options, callback=prog_func)
+    if uses_temp_file and dstband.DataType in unsigned_types and not quiet:
+        print(
+            "Warning: the %s output data type requires a temporary file. "
+            "Consider using Float32 or Int32 instead."
+            % gdal.GetDataTypeName(dstband.DataType),
+            file=sys.stderr,
+        )
+
+    # With a threshold, distances are computed in memory and directly
+    # turned into a mask, rather than written to the output and read back.
+    # If they do not fit in the block cache, they go through a temporary
+    # file instead, as gdal.ComputeProximity() does for unsigned types.
+    proxband = dstband
+    prox_ds = None
+    prox_dir = None
+    try:
+        if threshold is not None:
+            nodata = get_output_nodata(parse_alg_options(alg_options), dstband)
+
+            if 4 * dstband.XSize * dstband.YSize > gdal.GetCacheMax():
+                prox_dir = tempfile.mkdtemp(prefix="gdal_proximity_")
+                prox_drv = gdal.GetDriverByName("GTiff")
+                prox_filename = os.path.join(prox_dir, "proximity.tif")
+            else:
+                prox_drv = gdal.GetDriverByName("MEM")
+                prox_filename = ""
+
+            prox_ds = prox_drv.Create(
+                prox_filename, dstband.XSize, dstband.YSize, 1, gdal.GDT_Float32
+            )
+            proxband = prox_ds.GetRasterBand(1)
+            proxband.SetNoDataValue(nodata)
+
+        if engine != "gdal":
+            compute_proximity_numpy(srcband, proxband, alg_options, engine)
+            if prog_func is not None:
+                prog_func(1.0)
+
+        elif halo is not None:
+            compute_proximity_strips(
+                src_filename, src_band_n, proxband, alg_options, halo, num_threads
+            )
+            if prog_func is not None:
+                prog_func(1.0)
+
+        else:
+            # The algorithm does a top-to-bottom and a bottom-to-top pass over
+            # the destination band (or over a Float32 temporary file for
+            # unsigned output data types), so make sure the block cache is
+            # large enough to keep it in memory, unless the user configured
+            # it explicitly.
+            config_options = {}
+            if gdal.GetConfigOption("GDAL_CACHEMAX") is None:
+                working_size = src_ds.RasterXSize * src_ds.RasterYSize * 4
+                cache_max = min(working_size, 2048 * 1024 * 1024)
+                if cache_max > gdal.GetCacheMax():
+                    config_options["GDAL_CACHEMAX"] = cache_max
+
+            with gdal.config_options(config_options, thread_local=False):
+                gdal.ComputeProximity(
+                    srcband, proxband, alg_options, callback=prog_func
+                )
+                dst_ds.FlushCache()
+
+        if threshold is not None:
+            threshold_proximity(proxband, dstband, threshold)
+            dst_ds.FlushCache()
+    finally:
+        # Close the temporary dataset before removing its file
+        proxband = None
+        prox_ds = None
+        if prox_dir is not None:
+            shutil.rmtree(prox_dir)
+
+    if copy_drv is not None:
+        copy_drv.CreateCopy(dst_filename, dst_ds, options=creation_options)
 
     srcband = None
     dstband = None
@@ -223,5 +481,239 @@ def gdal_proximity(
     dst_ds = None
 
 
+def num_threads_type(value: str) -> int:
+    if value.upper() == "ALL_CPUS":
+        return os.cpu_count()
+    return int(value)
+
+
+# Options whose value may start with a dash
+NUMERIC_VALUE_OPTIONS = (
+    "-values",
+    "-maxdist",
+    "-nodata",
+    "-fixed-buf-val",
+    "-threshold",
+)
+
+
+class GDALProximity(GDALScript):
+    def __init__(self):
+        super().__init__()
+        self.title = "Produces a raster proximity map"
+        self.description = textwrap.dedent(
+            """\
+            It generates a raster proximity map indicating the distance
+            from the center of each pixel to the center of the nearest pixel
+            identified as a target pixel. Target pixels are those in the source
+            raster for which the raster pixel value is in the set of target pixel values."""
+        )
+
+    def get_parser(self, argv) -> GDALArgumentParser:
+        parser = self.parser
+
+        parser.add_argument(
+            "-q",
+            "-quiet",
+            dest="quiet",
+            action="store_true",
+            help="The script runs in quiet mode. "
+            "The progress monitor is suppressed and routine messages are not displayed.",
+        )
+
+        parser.add_argument(
+            "-srcband",
+            dest="src_band_n",
+            metavar="band",
+            type=int,
+            default=1,
+            help="Identifies the band in the source file to use (default is 1).",
+        )
+
+        parser.add_argument(
+            "-dstband",
+            dest="dst_band_n",
+            metavar="band",
+            type=int,
+            default=1,
+            help="Identifies the band in the destination file to use (default is 1).",
+        )
+
+        parser.add_argument(
+            "-of",
+            "-f",
+            dest="driver_name",
+            metavar="gdal_format",
+            help="Select the output format. "
+            "If not specified, the format is guessed from the extension. "
+            "Use the short format name.",
+        )
+
+        parser.add_argument(
+            "-co",
+            dest="creation_options",
+            type=str,
+            default=[],
+            action="append",
+            metavar="name=value",
+            help="Passes a creation option to the output format driver. Multiple "
+            "options may be listed. See format specific documentation for legal "
+            "creation options for each format.",
+        )
+
+        parser.add_argument(
+            "-ot",
+            dest="creation_type",
+            type=str,
+            metavar="type",
+            help="Specify a data type supported by the driver "
+            "(default Float32, or Byte with -threshold).",
+        )
+
+        parser.add_argument(
+            "-auto_type",
+            dest="auto_type",
+            action="store_true",
+            help="Create the output as Float32 instead of an unsigned -ot type "
+            "(Byte, UInt16 or UInt32), which would require a temporary file.",
+        )
+
+        parser.add_argument(
+            "-values",
+            dest="values",
+            type=str,
+            metavar="n,n,n",
+            help="A list of target pixel values in the source image to be "
+            "considered target pixels. If not specified, all non-zero pixels "
+            "will be considered target pixels.",
+        )
+
+        parser.add_argument(
+            "-distunits",
+            dest="distunits",
+            type=str.upper,
+            choices=["PIXEL", "GEO"],
+            help="Indicate whether distances generated should be in pixel or "
+            "georeferenced coordinates (default PIXEL).",
+        )
+
+        parser.add_argument(
+            "-maxdist",
+            dest="maxdist",
+            type=str,
+            metavar="n",
+            help="The maximum distance to be generated. "
+            "The nodata value will be used for pixels beyond this distance.",
+        )
+
+        parser.add_argument(
+            "-nodata",
+            dest="nodata",
+            type=str,
+            metavar="n",
+            help="Specify a nodata value to use for the destination proximity raster.",
+        )
+
+        parser.add_argument(
+            "-use_input_nodata",
+            dest="use_input_nodata",
+            type=str.upper,
+            choices=["YES", "NO"],
+            help="Indicate whether nodata pixels in the input raster should be "
+            "nodata in the output raster (default NO).",
+        )
+
+        parser.add_argument(
+            "-fixed-buf-val",
+            dest="fixed_buf_val",
+            type=str,
+            metavar="n",
+            help="Specify a value to be applied to all pixels that are within "
+            "the -maxdist of target pixels (including the target pixels) "
+            "instead of a distance value.",
+        )
+
+        parser.add_argument(
+            "-threshold",
+            dest="threshold",
+            type=float,
+            metavar="n",
+            help="Write a mask set to 1 for pixels whose distance is at most n, "
+            "and 0 elsewhere, instead of the distances.",
+        )
+
+        parser.add_argument(
+            "-engine",
+            dest="engine",
+            choices=["gdal", "scipy", "opencv", "cupy"],
+            default="gdal",
+            help="Select the implementation used to compute distances (default gdal).",
+        )
+
+        parser.add_argument(
+            "-num_threads",
+            dest="num_threads",
+            type=num_threads_type,
+            default=1,
+            metavar="n|ALL_CPUS",
+            help="Number of threads to use with the gdal engine, "
+            "when -maxdist is specified (default 1).",
+        )
+
+        parser.add_argument(
+            "src_filename",
+            type=str,
+            help="The source raster file used to identify target pixels.",
+        )
+
+        parser.add_argument(
+            "dst_filename",
+            type=str,
+            help="The destination raster file to which the proximity map will be written. "
+            "It may be a pre-existing file of the same size as the source file. "
+            "If it does not exist it will be created.",
+        )
+
+        return parser
+
+    def parse(self, argv) -> dict:
+        # argparse would take values starting with a dash that are not plain
+        # negative numbers, such as "-values -1,-2" or "-nodata -3.4e38", for
+        # an option: attach them to their option instead.
+        new_argv = []
+        i = 0
+        while i < len(argv):
+            if argv[i] in NUMERIC_VALUE_OPTIONS and i + 1 < len(argv):
+                new_argv.append(argv[i] + "=" + argv[i + 1])
+                i += 2
+            else:
+                new_argv.append(argv[i])
+                i += 1
+        return super().parse(new_argv)
+
+    def augment_kwargs(self, kwargs) -> dict:
+        alg_options = []
+        for name, option in (
+            ("values", "VALUES"),
+            ("distunits", "DISTUNITS"),
+            ("maxdist", "MAXDIST"),
+            ("nodata", "NODATA"),
+            ("use_input_nodata", "USE_INPUT_NODATA"),
+            ("fixed_buf_val", "FIXED_BUF_VAL"),
+        ):
+            value = kwargs.pop(name)
+            if value is not None:
+                alg_options.append(option + "=" + value)
+        kwargs["alg_options"] = alg_options
+        return kwargs
+
+    def doit(self, **kwargs):
+        return gdal_proximity(**kwargs)
+
+
+def main(argv=sys.argv):
+    return GDALProximity().main(argv)
+
+
 if __name__ == "__main__":
     sys.exit(main(sys.argv))
@@ -11,52 +11,414 @@
 # SPDX-License-Identifier: MIT
 ###############################################################################
 
+import os
+import shutil
+import struct
 import sys
+import tempfile
+from multiprocessing import Pool
 
-from osgeo import ogr
+import numpy as np
+
+from osgeo import gdal, ogr
+
+try:
+    import numba
+except ImportError:
+    numba = None
 
 #############################################################################
 
 
-def TransformPoint(xyz):
+# Default translation applied to the features: (dx, dy, dz)
+DEFAULT_OFFSET = (1000.0, 0.0, 0.0)
+
+# Number of input features from which another output format than ESRI
+# Shapefile is suggested.
+LARGE_LAYER_FEATURE_COUNT = 100000
+
+
+def ShiftCoordinates(coords, dx, dy, dz):
+    """Translate, in place, a (N, 2) or (N, 3) array of coordinates, and
+    return it. dz is ignored for 2D coordinates."""
+
+    coords[:, 0] += dx
+    coords[:, 1] += dy
+    if coords.shape[1] > 2:
+        coords[:, 2] += dz
+    return coords
+
 
-    x = xyz[0]
-    y = xyz[1]
-    z = xyz[2]
+if numba is not None:
 
-    x = x + 1000
+    @numba.njit(cache=True)
+    def ShiftCoordinates(coords, dx, dy, dz):  # noqa: F811
+        """Same as the NumPy implementation above, compiled to native code
+        with numba.
 
-    return (x, y, z)
+        It is mostly called on small arrays (one per geometry part), so the
+        loop is not parallelized, which would cost more in thread dispatch
+        than the additions themselves."""
+
+        has_z = coords.shape[1] > 2
+        for i in range(coords.shape[0]):
+            coords[i, 0] += dx
+            coords[i, 1] += dy
+            if has_z:
+                coords[i, 2] += dz
+        return coords
 
 
 #############################################################################
 
 
-def WalkAndTransform(geom):
+def WalkAndTransform(geom, dx, dy, dz):
 
-    if geom.GetGeometryCount() > 0:
-        for i in range(geom.GetGeometryCount()):
-            old_geom = geom.GetGeometryRef(i)
-            new_geom = WalkAndTransform(old_geom)
-            if new_geom is not old_geom:
-                geom.SetGeometryDirectly(new_geom)
+    if (dx == 0 and dy == 0 and dz == 0) or geom.IsEmpty():
         return geom
 
-    for i in range(geom.GetPointCount()):
-        xyz = (geom.GetX(i), geom.GetY(i), geom.GetZ(i))
+    # Walk the geometry tree with an explicit stack rather than by recursion.
+    # Leaf geometries are modified in place, so there is no need to
+    # reassign them to their parent.
+    stack = [geom]
+    while stack:
+        g = stack.pop()
+
+        n = g.GetGeometryCount()
+        if n > 0:
+            stack.extend(g.GetGeometryRef(i) for i in range(n))
+            continue
+
+        # Fetch all vertices at once, and shift them with a single vectorized
+        # operation, rather than going through GetX()/GetY()/GetZ() for each
+        # point.
+        n = g.GetPointCount()
+        if n == 0:
+            continue
+
+        # Only fetch and write back Z for 3D geometries, which also avoids
+        # promoting 2D ones to 3D.
+        if g.Is3D():
+            xyz = ShiftCoordinates(
+                np.array(g.GetPoints(nCoordDimension=3), dtype=np.float64),
+                dx,
+                dy,
+                dz,
+            )
+
+            for i, (x, y, z) in enumerate(xyz.tolist()):
+                g.SetPoint(i, x, y, z)
+
+        elif dx != 0 or dy != 0:
+            xy = ShiftCoordinates(
+                np.array(g.GetPoints(nCoordDimension=2), dtype=np.float64),
+                dx,
+                dy,
+                dz,
+            )
+
+            for i, (x, y) in enumerate(xy.tolist()):
+                g.SetPoint_2D(i, x, y)
 
-        xyz = TransformPoint(xyz)
+    return geom
 
-        geom.SetPoint(i, xyz[0], xyz[1], xyz[2])
 
-    return geom
+#############################################################################
+
+# Simple feature geometry types, made of linear parts only
+LINEAR_TYPES = (
+    ogr.wkbPoint,
+    ogr.wkbLineString,
+    ogr.wkbPolygon,
+    ogr.wkbMultiPoint,
+    ogr.wkbMultiLineString,
+    ogr.wkbMultiPolygon,
+    ogr.wkbGeometryCollection,
+)
+
+# Byte order of exported WKB, so that coordinates can be viewed as native
+# float64 values.
+NATIVE_WKB_ORDER = ogr.wkbXDR if sys.byteorder == "big" else ogr.wkbNDR
+
+
+def TransformWkb(wkb, dx, dy, dz):
+    """Translate in place the coordinates of a WKB bytearray, in native byte
+    order, of one of the LINEAR_TYPES geometry types.
+
+    Each point, line string or ring is shifted through a NumPy view on the
+    WKB buffer, without creating Python objects for its vertices."""
+
+    def shift_part(n, offset):
+        coords = np.frombuffer(wkb, dtype=np.float64, count=n * ndims, offset=offset)
+        # The third ordinate is M, not Z, for XYM geometries
+        ShiftCoordinates(coords.reshape(n, ndims), dx, dy, dz if has_z else 0.0)
+        return offset + n * ndims * 8
+
+    # Geometries of a collection directly follow its header, so the buffer
+    # can be parsed linearly, counting the geometries left to parse.
+    offset = 0
+    remaining = 1
+    while remaining > 0:
+        remaining -= 1
+
+        geom_type = struct.unpack_from("=I", wkb, offset + 1)[0]
+        offset += 5
+
+        # Dimensions are either given by the OGC 2.5D flags, or by the ISO
+        # WKB type codes (1001 for Point Z, 2002 for LineString M, ...)
+        iso_dims = (geom_type & 0xFFFF) // 1000
+        has_z = bool(geom_type & 0x80000000) or iso_dims in (1, 3)
+        has_m = bool(geom_type & 0x40000000) or iso_dims in (2, 3)
+        ndims = 2 + has_z + has_m
+
+        flat_type = (geom_type & 0xFFFF) % 1000
+        if flat_type == ogr.wkbPoint:
+            offset = shift_part(1, offset)
+        elif flat_type == ogr.wkbLineString:
+            n = struct.unpack_from("=I", wkb, offset)[0]
+            offset = shift_part(n, offset + 4)
+        elif flat_type == ogr.wkbPolygon:
+            num_rings = struct.unpack_from("=I", wkb, offset)[0]
+            offset += 4
+            for _ in range(num_rings):
+                n = struct.unpack_from("=I", wkb, offset)[0]
+                offset = shift_part(n, offset + 4)
+        elif flat_type in LINEAR_TYPES:
+            remaining += struct.unpack_from("=I", wkb, offset)[0]
+            offset += 4
+        else:
+            raise ValueError("Unsupported WKB geometry type: %d" % geom_type)
+
+
+#############################################################################
+
+
+def TransformArrowStream(in_layer, out_layer, offset=DEFAULT_OFFSET):
+    """Copy and transform all features of in_layer into out_layer by batches,
+    using the Arrow stream interface.
+
+    Returns False if that is not possible (missing pyarrow or shapely
+    modules, geometries that shapely cannot handle without loss, or source
+    and target layer schemas that do not match), in which
+    case the caller must fall back to the feature per feature approach.
+    Raises RuntimeError if a batch cannot be written.
+    """
+
+    try:
+        import pyarrow as pa
+        import shapely
+    except ImportError:
+        return False
+
+    in_defn = in_layer.GetLayerDefn()
+    out_defn = out_layer.GetLayerDefn()
+    if in_defn.GetGeomFieldCount() != 1:
+        return False
+    # shapely.transform() drops M values, and shapely does not support
+    # curves, polyhedral surfaces and TINs. Geometry collections are
+    # excluded too, as they may have curve members.
+    geom_type = in_defn.GetGeomType()
+    if (
+        ogr.GT_HasM(geom_type)
+        or ogr.GT_Flatten(geom_type) not in LINEAR_TYPES
+        or ogr.GT_Flatten(geom_type) == ogr.wkbGeometryCollection
+    ):
+        return False
+    # The shapefile driver may have truncated or renamed fields
+    in_names = [
+        in_defn.GetFieldDefn(i).GetName() for i in range(in_defn.GetFieldCount())
+    ]
+    out_names = [
+        out_defn.GetFieldDefn(i).GetName() for i in range(out_defn.GetFieldCount())
+    ]
+    if in_names != out_names:
+        return False
+
+    geom_name = in_layer.GetGeometryColumn() or "wkb_geometry"
+    # The stream has an OGC_FID column when the source has no FID column,
+    # which must not be taken as a regular field of the output layer.
+    write_options = [
+        "GEOMETRY_NAME=" + geom_name,
+        "FID=" + (in_layer.GetFIDColumn() or "OGC_FID"),
+    ]
+
+    def shift(coords):
+        return ShiftCoordinates(coords, *offset)
+
+    is_identity = offset == (0, 0, 0)
+
+    stream = in_layer.GetArrowStreamAsPyArrow()
+    for batch in stream:
+        # With an identity transformation, batches are written unchanged,
+        # without decoding their geometries.
+        if not is_identity:
+            names = [batch.type.field(i).name for i in range(batch.type.num_fields)]
+            columns = batch.flatten()
+
+            idx = names.index(geom_name)
+            geoms = shapely.from_wkb(columns[idx].to_numpy(zero_copy_only=False))
+
+            # Transform all geometries of the batch at once, preserving
+            # the dimensionality of each of them.
+            has_z = shapely.has_z(geoms)
+            geoms[has_z] = shapely.transform(geoms[has_z], shift, include_z=True)
+            geoms[~has_z] = shapely.transform(geoms[~has_z], shift, include_z=False)
+
+            columns[idx] = pa.array(shapely.to_wkb(geoms), type=pa.binary())
+            batch = pa.StructArray.from_arrays(columns, names=names)
+
+        err = out_layer.WritePyArrow(batch, options=write_options)
+        if err != ogr.OGRERR_NONE:
+            raise RuntimeError("Failed to write features: %s" % gdal.GetLastErrorMsg())
+
+    return True
+
+
+#############################################################################
+
+
+def CreateOutputLayer(out_ds, in_layer):
+    """Create in out_ds a layer with the fields of in_layer.
+
+    Returns the layer, and the map from the input fields to the output ones,
+    with -1 for fields that the output driver could not create.
+    """
+
+    in_defn = in_layer.GetLayerDefn()
+
+    out_layer = out_ds.CreateLayer(
+        in_defn.GetName(), geom_type=in_defn.GetGeomType(), srs=in_layer.GetSpatialRef()
+    )
+
+    in_field_count = in_defn.GetFieldCount()
+    field_map = []
+
+    for fld_index in range(in_field_count):
+        src_fd = in_defn.GetFieldDefn(fld_index)
+
+        fd = ogr.FieldDefn(src_fd.GetName(), src_fd.GetType())
+        fd.SetWidth(src_fd.GetWidth())
+        fd.SetPrecision(src_fd.GetPrecision())
+        if out_layer.CreateField(fd) == ogr.OGRERR_NONE:
+            field_map.append(out_layer.GetLayerDefn().GetFieldCount() - 1)
+        else:
+            field_map.append(-1)
+
+    return out_layer, field_map
+
+
+#############################################################################
+
+
+def TransformFeatures(
+    in_layer, out_layer, field_map, max_features=None, offset=DEFAULT_OFFSET
+):
+    """Copy and transform the features of in_layer into out_layer, one at a
+    time. Fields are copied by index, as given by field_map, which is
+    returned by CreateOutputLayer().
+
+    Raises RuntimeError if the fields of a feature cannot be copied.
+    """
+
+    # A single output feature is reused for all input features.
+    out_feat = ogr.Feature(feature_def=out_layer.GetLayerDefn())
+
+    # Resolve the methods called for each feature only once.
+    get_next_feature = in_layer.GetNextFeature
+    create_feature = out_layer.CreateFeature
+    set_from = out_feat.SetFromWithMap
+    set_geometry = out_feat.SetGeometryDirectly
+    is_identity = offset == (0, 0, 0)
+
+    count = 0
+    in_feat = get_next_feature()
+    while in_feat is not None:
+
+        # Linear geometries are directly transformed in their WKB export,
+        # rather than on a clone of the source geometry. Geometry collections
+        # may have curve members, which TransformWkb() does not handle.
+        src_geom = in_feat.GetGeometryRef()
+        if is_identity or src_geom is None:
+            geom = src_geom.Clone() if src_geom is not None else None
+        elif (
+            ogr.GT_Flatten(src_geom.GetGeometryType()) in LINEAR_TYPES
+            and not src_geom.HasCurveGeometry()
+        ):
+            wkb = bytearray(src_geom.ExportToWkb(NATIVE_WKB_ORDER))
+            TransformWkb(wkb, *offset)
+            geom = ogr.CreateGeometryFromWkb(bytes(wkb))
+        else:
+            geom = WalkAndTransform(src_geom.Clone(), *offset)
+
+        # Drop the source geometry, now that it has been copied or exported,
+        # so that SetFromWithMap() does not clone it into out_feat only for
+        # it to be replaced.
+        src_geom = None
+        in_feat.SetGeometryDirectly(None)
+
+        if set_from(in_feat, 1, field_map) != ogr.OGRERR_NONE:
+            raise RuntimeError(
+                "Failed to copy the fields of feature %d" % in_feat.GetFID()
+            )
+        set_geometry(geom)
+
+        # Drivers such as GPKG assign the new FID to the written feature:
+        # reset it so that the next one is appended too.
+        out_feat.SetFID(ogr.NullFID)
+        create_feature(out_feat)
+
+        in_feat.Destroy()
+
+        count += 1
+        if max_features is not None and count == max_features:
+            break
+        in_feat = get_next_feature()
+
+    out_feat.Destroy()
+
+
+#############################################################################
+
+
+def TransformShard(args):
+    """Process a range of features of the input layer into a separate file,
+    in the output format.
+
+    This is run in a worker process: datasets cannot be shared between
+    processes, so the input is opened again here.
+    """
+
+    infile, layer_name, out_format, shard_file, start, count, offset = args
+
+    in_ds = ogr.Open(infile, update=0)
+
+    if layer_name is not None:
+        in_layer = in_ds.GetLayerByName(layer_name)
+    else:
+        in_layer = in_ds.GetLayer(0)
+
+    shp_ds = ogr.GetDriverByName(out_format).CreateDataSource(shard_file)
+    shp_layer, field_map = CreateOutputLayer(shp_ds, in_layer)
+
+    in_layer.SetNextByIndex(start)
+    shp_layer.StartTransaction()
+    TransformFeatures(in_layer, shp_layer, field_map, max_features=count, offset=offset)
+    shp_layer.CommitTransaction()
+
+    shp_ds.Destroy()
+    in_ds.Destroy()
+
+    return shard_file
 
 
 #############################################################################
 
 
 def Usage():
-    print("Usage: vec_tr.py infile outfile [layer]")
+    print(
+        "Usage: vec_tr.py [-j <num_processes>] [-f <format>] [-offset <dx> <dy> <dz>]"
+    )
+    print("                 infile outfile [layer]")
     print("")
     return 2
 
@@ -65,9 +427,27 @@ def main(argv=sys.argv):
     infile = None
     outfile = None
     layer_name = None
+    num_processes = 1
+    out_format = "ESRI Shapefile"
+    offset = DEFAULT_OFFSET
+
+    i = 1
+    while i < len(argv):
+        arg = argv[i]
+
+        if arg == "-j" and i < len(argv) - 1:
+            i = i + 1
+            num_processes = int(argv[i])
+
+        elif arg == "-f" and i < len(argv) - 1:
+            i = i + 1
+            out_format = argv[i]
 
-    for arg in argv[1:]:
-        if infile is None:
+        elif arg == "-offset" and i < len(argv) - 3:
+            offset = tuple(float(v) for v in argv[i + 1 : i + 4])
+            i = i + 3
+
+        elif infile is None:
             infile = arg
 
         elif outfile is None:
@@ -79,6 +459,8 @@ def main(argv=sys.argv):
         else:
             return Usage()
 
+        i = i + 1
+
     if outfile is None:
         return Usage()
 
@@ -92,49 +474,98 @@ def main(argv=sys.argv):
     else:
         in_layer = in_ds.GetLayer(0)
 
-    in_defn = in_layer.GetLayerDefn()
-
     #############################################################################
     # Create output file with similar information.
 
-    shp_driver = ogr.GetDriverByName("ESRI Shapefile")
+    shp_driver = ogr.GetDriverByName(out_format)
+    if shp_driver is None:
+        print("Unknown output format: %s" % out_format)
+        return 1
+
     shp_driver.DeleteDataSource(outfile)
 
     shp_ds = shp_driver.CreateDataSource(outfile)
 
-    shp_layer = shp_ds.CreateLayer(
-        in_defn.GetName(), geom_type=in_defn.GetGeomType(), srs=in_layer.GetSpatialRef()
-    )
-
-    in_field_count = in_defn.GetFieldCount()
-
-    for fld_index in range(in_field_count):
-        src_fd = in_defn.GetFieldDefn(fld_index)
-
-        fd = ogr.FieldDefn(src_fd.GetName(), src_fd.GetType())
-        fd.SetWidth(src_fd.GetWidth())
-        fd.SetPrecision(src_fd.GetPrecision())
-        shp_layer.CreateField(fd)
+    shp_layer, field_map = CreateOutputLayer(shp_ds, in_layer)
 
     #############################################################################
     # Process all features in input layer.
 
-    in_feat = in_layer.GetNextFeature()
-    while in_feat is not None:
+    # Shapefiles are written one record at a time, whereas formats such as
+    # FlatGeobuf build their index in a single pass when closed.
+    if (
+        out_format == "ESRI Shapefile"
+        and in_layer.GetFeatureCount(force=0) > LARGE_LAYER_FEATURE_COUNT
+    ):
+        print(
+            "Note: consider using -f FlatGeobuf or -f GPKG for faster output "
+            "of large layers.",
+            file=sys.stderr,
+        )
+
+    # Shards are written as temporary files in the output format, so the
+    # features can only be processed in several processes for file based
+    # formats.
+    extension = shp_driver.GetMetadataItem(gdal.DMD_EXTENSION)
+    if not extension:
+        num_processes = 1
+
+    feature_count = in_layer.GetFeatureCount() if num_processes > 1 else 0
+
+    if num_processes > 1 and feature_count > num_processes:
+        # Split the input layer in ranges of features, that are each
+        # transformed by a separate process into a temporary file. Those
+        # shards are then appended to the output. They are written in the
+        # output format, so that their fields are named and typed the same
+        # way as the output ones.
+        tmpdir = tempfile.mkdtemp(prefix="vec_tr_")
+        chunk_size = (feature_count + num_processes - 1) // num_processes
+        jobs = [
+            (
+                infile,
+                layer_name,
+                out_format,
+                os.path.join(tmpdir, "part%d.%s" % (k, extension)),
+                start,
+                chunk_size,
+                offset,
+            )
+            for k, start in enumerate(range(0, feature_count, chunk_size))
+        ]
+
+        try:
+            with Pool(num_processes) as pool:
+                shard_files = pool.map(TransformShard, jobs)
+
+            for shard_file in shard_files:
+                gdal.VectorTranslate(
+                    shp_ds,
+                    shard_file,
+                    accessMode="append",
+                    layerName=shp_layer.GetName(),
+                )
+        except RuntimeError as e:
+            print(e)
+            shp_ds.Destroy()
+            in_ds.Destroy()
+            return 1
+        finally:
+            shutil.rmtree(tmpdir)
 
-        geom = in_feat.GetGeometryRef().Clone()
-
-        geom = WalkAndTransform(geom)
-
-        out_feat = ogr.Feature(feature_def=shp_layer.GetLayerDefn())
-        out_feat.SetFrom(in_feat)
-        out_feat.SetGeometryDirectly(geom)
-
-        shp_layer.CreateFeature(out_feat)
-        out_feat.Destroy()
-
-        in_feat.Destroy()
-        in_feat = in_layer.GetNextFeature()
+    else:
+        # Write all features in a single transaction, for the drivers that
+        # support it, rather than committing each of them.
+        shp_layer.StartTransaction()
+        try:
+            if not TransformArrowStream(in_layer, shp_layer, offset):
+                TransformFeatures(in_layer, shp_layer, field_map, offset=offset)
+        except RuntimeError as e:
+            print(e)
+            shp_layer.RollbackTransaction()
+            shp_ds.Destroy()
+            in_ds.Destroy()
+            return 1
+        shp_layer.CommitTransaction()
 
     #############################################################################
     # Cleanup